@@ -0,0 +1,481 @@
+import os
+import asyncio
+import contextvars
+import functools
+import hashlib
+import re
+import threading
+from typing import TypedDict, Optional, List, Tuple
+import string # Video ID 문자 검사용
+from dotenv import load_dotenv
+
+# LangChain & LangGraph
+from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.messages import HumanMessage
+from langgraph.graph import StateGraph, END
+from pydantic import BaseModel, Field
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+
+# 자막 추출 라이브러리
+from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
+
+
+# 환경 변수 로드 (GOOGLE_API_KEY, GEMINI_RPM, GEMINI_TPM)
+load_dotenv()
+
+# State 정의
+class AgentState(TypedDict):
+    youtube_url: str
+    video_id: Optional[str]
+    script_text: Optional[str]          # 프롬프트 길이에 맞게 줄인 스크립트
+    risk_keyword_count: Optional[int]   # 줄이기 전 전체 스크립트에서 센 위험 키워드 수
+    analysis_result: Optional[str]
+    error: Optional[str]
+
+# Video ID는 구분자('v=', '/') 바로 뒤의 11글자 ('youtu.be/ID'도 '/'로 잡힘)
+_VIDEO_ID_LENGTH = 11
+_VIDEO_ID_CHARS = frozenset(string.ascii_letters + string.digits + "_-")
+_VIDEO_ID_DELIMITERS = ("v=", "/")
+
+# 비디오 url에서 video_id 추출하기
+def extract_video_id(url: str) -> Optional[str]:
+    for delimiter in _VIDEO_ID_DELIMITERS:
+        index = url.find(delimiter)
+        while index != -1:
+            start = index + len(delimiter)
+            candidate = url[start:start + _VIDEO_ID_LENGTH]
+            if len(candidate) == _VIDEO_ID_LENGTH and _VIDEO_ID_CHARS.issuperset(candidate):
+                return candidate
+            index = url.find(delimiter, index + 1)
+    return None
+
+# 자막 캐시에 보관할 최대 영상 수
+SCRIPT_CACHE_SIZE = 1024
+
+# video_id에서 스크립트 추출하기 (전체 자막, 캐시하지 않음)
+def get_video_script(video_id: str) -> str:
+    try:
+        return _fetch_video_script(video_id)
+    except Exception as e:
+        return _script_error(e)
+
+def _script_error(e: Exception) -> str:
+    if isinstance(e, (TranscriptsDisabled, NoTranscriptFound)):
+        return "ERROR: 이 영상에는 자막이 없습니다."
+    return f"ERROR: 자막 추출 실패 ({e.__class__.__name__}: {str(e)})"
+
+# 프롬프트용으로 줄인 스크립트와 전체 스크립트의 위험 키워드 수를 함께 반환
+# (잘라낸 구간에만 위험 문구가 있어도 사전 검사에서 놓치지 않도록 줄이기 전에 셈)
+def load_script(video_id: str) -> Tuple[str, int]:
+    try:
+        return _load_script(video_id)
+    except Exception as e:
+        return _script_error(e), 0
+
+# 같은 영상의 자막은 다시 받지 않도록 캐시 (예외는 캐시되지 않으므로 일시적인 오류는 다음 요청에서 재시도)
+# 전체 자막(긴 강의는 수 MB)이 아니라 실제로 쓰는 줄인 스크립트와 키워드 수만 보관
+@functools.lru_cache(maxsize=SCRIPT_CACHE_SIZE)
+def _load_script(video_id: str) -> Tuple[str, int]:
+    script = _fetch_video_script(video_id)
+    if script.startswith("ERROR"):
+        return script, 0
+    return trim_to_token_budget(script), count_risk_keywords(script)
+
+# YouTubeTranscriptApi는 내부 requests 세션을 재사용하므로 스레드마다 하나씩 만들어 두고 연결을 유지
+# (세션은 스레드 간 공유가 안전하지 않아 to_thread 작업 스레드별로 분리)
+_thread_local = threading.local()
+
+def get_transcript_api() -> YouTubeTranscriptApi:
+    ytt_api = getattr(_thread_local, "ytt_api", None)
+    if ytt_api is None:
+        ytt_api = _thread_local.ytt_api = YouTubeTranscriptApi()
+    return ytt_api
+
+def _fetch_video_script(video_id: str) -> str:
+    #transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+    transcript_list = get_transcript_api().list(video_id)
+
+    # 'ko' -> 'en' 순서로 찾음 (find_transcript가 언어마다 수동 자막을 먼저, 없으면 자동 생성 자막을 찾음)
+    try:
+        transcript = transcript_list.find_transcript(['ko', 'en'])
+    except NoTranscriptFound:
+        # 한국어/영어가 없는 경우 번역 가능한 자막을 한국어로 번역
+        # [ TODO ]: 한국어로 번역할지, 그냥 쓸지 정해야 함
+        transcript = next((t for t in transcript_list if t.is_translatable), None)
+        if transcript is None:
+            return "ERROR: 적절한 자막을 찾을 수 없습니다."
+        transcript = transcript.translate('ko')
+
+    return join_snippets(transcript.fetch())
+
+def join_snippets(snippets) -> str:
+    # 자막 조각을 바로 이어 붙여 줄바꿈 포함 중간 문자열을 만들지 않음
+    # (제너레이터 대신 리스트를 넘겨 join이 내부에서 다시 리스트로 복사하지 않게 함)
+    return " ".join([snippet.text.replace("\n", " ") for snippet in snippets])
+
+# --- 4. 노드 함수 ---
+def make_script_loader_node(model_name: str):
+    async def script_loader_node(state: AgentState):
+        # 검색 결과 등으로 video_id를 이미 알고 있으면 URL 파싱을 생략
+        video_id = state.get("video_id") or extract_video_id(state['youtube_url'])
+        if not video_id:
+            return {"error": "유효하지 않은 유튜브 URL입니다."}
+
+        # youtube_transcript_api는 동기 HTTP 요청이므로 이벤트 루프를 막지 않도록 스레드에서 실행
+        # (긴 스크립트의 키워드 검사도 같은 스레드에서 처리)
+        # 분석에 쓸 Gemini 클라이언트가 아직 없으면 자막을 받는 동안 함께 만들어 둠
+        if model_name in _llms:
+            script, risk_keyword_count = await asyncio.to_thread(load_script, video_id)
+        else:
+            (script, risk_keyword_count), _ = await asyncio.gather(
+                asyncio.to_thread(load_script, video_id),
+                asyncio.to_thread(warm_up_llm, model_name),
+            )
+        if script.startswith("ERROR"):
+            return {"error": script, "script_text": None}
+
+        # 프롬프트에 들어갈 만큼만 그래프 상태에 담음
+        return {"video_id": video_id, "script_text": script, "risk_keyword_count": risk_keyword_count}
+
+    return script_loader_node
+
+# --- 5. 텍스트 분석 (요청 묶음 처리) ---
+# [TODO] : 모델을 무엇으로 할지 정해야 함
+MODEL_NAME = "gemini-2.5-flash-lite"
+
+# 한 번의 Gemini 호출에 묶는 최대 스크립트 수 (너무 크게 잡으면 판정 정확도가 떨어짐)
+MAX_BATCH = 8
+# 첫 요청이 들어온 뒤 같은 묶음에 넣을 요청을 기다리는 최대 시간
+MAX_WAIT_MS = 50
+
+
+# Gemini 분당 요청 수/토큰 수 한도 (사용 중인 요금제에 맞게 환경 변수로 조정)
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "60"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "250000"))
+_request_limiter = AsyncLimiter(GEMINI_RPM, 60)
+_token_limiter = AsyncLimiter(GEMINI_TPM, 60)
+
+
+# 구조화된 출력
+class Report(BaseModel):
+    estimation: str = Field(description="[고위험 / 주의 필요 / 안전] 중 하나로 판단해주세요.")
+    detail: str = Field(description="주요 적발 소견으로 자극적 키워드, 심리 조작 기법, 유도 방식을 설명해주세요.")
+    summary: str = Field(description="20자 내외의 짧은 문장으로 요약해주세요.")
+
+class BatchReportItem(Report):
+    index: int = Field(description="분석한 스크립트의 번호")
+
+class BatchReport(BaseModel):
+    reports: List[BatchReportItem] = Field(description="스크립트 번호별 분석 결과 목록")
+
+
+def format_report(report: Report) -> str:
+    response_dict = dict(report)
+    return f'[{response_dict.get("estimation", "error")}] {response_dict.get("summary", "error입니다")}'
+
+# 프롬프트에 넣을 스크립트의 최대 토큰 수 (한국어 기준 이전 글자 수 제한과 같은 분량)
+MAX_INPUT_TOKENS = 5000
+# 토큰 수 추정용 UTF-8 바이트 수 (한국어 약 1글자(3바이트)/토큰, 영어 약 4글자/토큰 -> 보수적으로 3)
+_BYTES_PER_TOKEN = 3
+
+def trim_to_token_budget(script: str, max_tokens: int = MAX_INPUT_TOKENS) -> str:
+    """
+    스크립트를 토큰 예산에 맞게 줄입니다.
+    한국어/영어가 섞인 글자 수 대신 UTF-8 바이트 수로 토큰 수를 추정하고,
+    예산을 넘으면 앞/가운데/끝 세 구간을 잘라 " ... "로 이어 붙입니다.
+    """
+    encoded = script.encode("utf-8")
+    budget = max_tokens * _BYTES_PER_TOKEN
+    if len(encoded) <= budget:
+        return script
+
+    window = budget // 3
+    middle = (len(encoded) - window) // 2
+    parts = [encoded[:window], encoded[middle:middle + window], encoded[-window:]]
+    return " ... ".join(part.decode("utf-8", "ignore") for part in parts)
+
+# 프롬프트나 모델을 바꾸면 올려서 이전 분석 결과 캐시를 무효화
+PROMPT_VERSION = "v2"
+
+# [TODO] : 프롬프트 수정해야 함
+# 고정된 앞/뒤 부분은 한 번만 만들어 두고, 요청마다 스크립트만 이어 붙임
+PROMPT_PREFIX = '''
+    당신은 소비자 보호 및 금융 사기 예방 전문가입니다.
+    아래 텍스트(유튜브 스크립트 등)를 정밀 분석하여, '불법 투자 권유', '기만적 상품 판매', 또는 '스팸성 콘텐츠'인지 판별하세요.
+
+    [분석할 스크립트]
+    "'''
+
+PROMPT_SUFFIX = '''" ... (이하 생략)
+
+    [중점 분석 항목]
+    1. **심리적 조작 및 공포 마케팅 (Fear & Greed)**
+    2. **비현실적 약속 및 과장 광고**
+    3. **위험한 행동 유도 (Call to Action)**
+
+    [최종 답변 형식]
+    허위 광고 등 유해 콘텐츠 분석 결과
+    '''
+
+def build_prompt(script: str) -> str:
+    return PROMPT_PREFIX + script + PROMPT_SUFFIX
+
+def build_batch_prompt(scripts: List[str]) -> str:
+    items = "\n\n".join(f'    [{i}] "{script}" ... (이하 생략)' for i, script in enumerate(scripts, 1))
+    return f"""
+    당신은 소비자 보호 및 금융 사기 예방 전문가입니다.
+    아래 번호가 매겨진 텍스트(유튜브 스크립트 등) {len(scripts)}개를 각각 정밀 분석하여, '불법 투자 권유', '기만적 상품 판매', 또는 '스팸성 콘텐츠'인지 판별하세요.
+    각 스크립트는 서로 독립적으로 판단하고, 스크립트 번호를 index로 하여 번호마다 결과를 하나씩 반환하세요.
+
+    [분석할 스크립트]
+{items}
+
+    [중점 분석 항목]
+    1. **심리적 조작 및 공포 마케팅 (Fear & Greed)**
+    2. **비현실적 약속 및 과장 광고**
+    3. **위험한 행동 유도 (Call to Action)**
+
+    [최종 답변 형식]
+    스크립트별 허위 광고 등 유해 콘텐츠 분석 결과
+    """
+
+_llms = {}
+
+def get_llm(model_name: str = MODEL_NAME) -> ChatGoogleGenerativeAI:
+    """Gemini 클라이언트를 모델별로 한 번만 만들어 모든 요청에서 재사용"""
+    llm = _llms.get(model_name)
+    if llm is None:
+        llm = _llms[model_name] = ChatGoogleGenerativeAI(model=model_name)
+    return llm
+
+# Gemini 클라이언트 미리 생성 (실패하면 분석 단계에서 다시 시도하며 에러가 보고됨)
+def warm_up_llm(model_name: str = MODEL_NAME):
+    try:
+        get_llm(model_name)
+    except Exception as e:
+        print(f"Gemini 클라이언트 준비 실패: {e}")
+
+def estimate_tokens(text: str) -> int:
+    return len(text.encode("utf-8")) // _BYTES_PER_TOKEN
+
+async def invoke_structured(schema, prompt_text: str):
+    """분당 요청/토큰 한도 안에서 Gemini를 호출 (한도를 넘기면 429 재시도로 오히려 느려짐)"""
+    await _token_limiter.acquire(min(estimate_tokens(prompt_text), GEMINI_TPM))
+    async with _request_limiter:
+        structed_model = get_llm().with_structured_output(schema)
+        return await structed_model.ainvoke([HumanMessage(content=prompt_text)])
+
+async def invoke_text(model_name: str, prompt_text: str) -> str:
+    """invoke_structured와 같은 한도 안에서 자유 형식(마크다운) 응답을 받음"""
+    await _token_limiter.acquire(min(estimate_tokens(prompt_text), GEMINI_TPM))
+    async with _request_limiter:
+        response = await get_llm(model_name).ainvoke([HumanMessage(content=prompt_text)])
+        return response.content
+
+async def analyze_scripts(scripts: List[str]) -> List[Report]:
+    """스크립트 목록을 한 번의 Gemini 호출로 분석하여 같은 순서의 Report 목록을 반환"""
+    if len(scripts) == 1:
+        report = await invoke_structured(Report, build_prompt(scripts[0]))
+        return [report]
+
+    response = await invoke_structured(BatchReport, build_batch_prompt(scripts))
+    by_index = {item.index: item for item in response.reports}
+
+    reports = []
+    for i, script in enumerate(scripts, 1):
+        report = by_index.get(i)
+        if report is None:
+            # 묶음 응답에서 빠진 스크립트는 개별로 다시 분석
+            report = (await analyze_scripts([script]))[0]
+        reports.append(report)
+    return reports
+
+
+class AnalysisBatcher:
+    """
+    동시에 들어온 분석 요청을 최대 MAX_BATCH개까지 모아 한 번의 Gemini 호출로 처리합니다.
+    공통 지시문을 한 번만 보내므로 요청당 프롬프트 토큰이 줄어듭니다.
+    """
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_wait_ms: int = MAX_WAIT_MS):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._pending = set()
+
+    async def submit(self, script: str) -> Report:
+        # 이벤트 루프가 바뀌었거나 처음 호출된 경우 수집 작업을 새로 띄움
+        # 빈 컨텍스트에서 띄워 처음 호출한 요청의 LangChain 설정(콜백, 트레이서 부모 실행)을 이후 묶음이 물려받지 않게 함
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = contextvars.Context().run(asyncio.create_task, self._collect())
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((script, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._pending.add(task)
+            task.add_done_callback(self._pending.discard)
+
+    async def _dispatch(self, batch):
+        scripts = [script for script, _ in batch]
+        print(f"🤖 Gemini 묶음 분석 요청 ({len(scripts)}건)")
+        try:
+            reports = await analyze_scripts(scripts)
+        except Exception as e:
+            if len(batch) > 1:
+                # 묶음 호출 하나가 실패해도 묶인 요청 전체가 실패하지 않도록 스크립트별로 다시 분석
+                print(f"묶음 분석 실패 ({e.__class__.__name__}) -> 개별 분석으로 재시도")
+                await asyncio.gather(*(self._dispatch([item]) for item in batch))
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), report in zip(batch, reports):
+            if not future.done():
+                future.set_result(report)
+
+
+_batcher = AnalysisBatcher()
+
+
+# --- 6. 위험 키워드 사전 검사 ---
+# 하나도 걸리지 않는 스크립트(요리, 음악 등)는 Gemini를 호출하지 않고 안전으로 판정
+RISK_KEYWORDS = [
+    # 비현실적 약속 및 과장 광고
+    "원금 보장", "무조건 오르는", "수익 보장", "확정 수익", "고수익", "급등주", "세력 매집", "비밀 정보",
+    "기적의 치료", "특효약", "완치", "부작용 없는", "병원에서도 알려주지 않는",
+    # 공포 마케팅 및 거짓 긴급성
+    "마감 임박", "지원금 소멸", "노후 파산", "지금 모르면",
+    # 외부 채널 유입 및 구매 유도
+    "리딩방", "오픈채팅", "카카오톡", "텔레그램", "고정 댓글", "상담 번호", "문자 주세요",
+    "비상장", "코인", "투자", "건강식품",
+    # 영어 스크립트
+    "guaranteed", "risk-free", "miracle", "cure", "invest", "crypto", "telegram", "whatsapp",
+]
+# 이 개수 미만으로 걸리면 LLM 분석을 건너뜀
+RISK_KEYWORD_THRESHOLD = 1
+SAFE_RESULT = "[안전] 위험 키워드가 없어 안전 가능성 높음"
+
+# 모든 키워드를 하나의 정규식으로 묶어 스크립트를 한 번만 훑음 (띄어쓰기 차이는 무시)
+_RISK_KEYWORD_RE = re.compile(
+    "|".join(re.escape(keyword).replace(r"\ ", r"\s*") for keyword in RISK_KEYWORDS),
+    re.IGNORECASE,
+)
+
+def count_risk_keywords(script: str) -> int:
+    return sum(1 for _ in _RISK_KEYWORD_RE.finditer(script))
+
+
+# --- 7. 분석 결과 캐시 ---
+# 같은 스크립트는 (영상이 달라도) Gemini를 다시 호출하지 않고 이전 결과를 재사용
+ANALYSIS_CACHE_SIZE = 1024
+ANALYSIS_CACHE_TTL_SEC = 24 * 60 * 60
+_analysis_cache = TTLCache(maxsize=ANALYSIS_CACHE_SIZE, ttl=ANALYSIS_CACHE_TTL_SEC)
+
+def script_cache_key(script: str) -> str:
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()
+
+
+async def text_analysis_node(state: AgentState):
+    if state.get("error"):
+        return {"analysis_result": f"분석 불가: {state['error']}"}
+        
+    script = state['script_text']
+    # 로더가 전체 스크립트에서 센 값을 사용 (없으면 받은 스크립트에서 직접 셈)
+    risk_keyword_count = state.get("risk_keyword_count")
+    if risk_keyword_count is None:
+        risk_keyword_count = count_risk_keywords(script)
+    if risk_keyword_count < RISK_KEYWORD_THRESHOLD:
+        print("위험 키워드 없음 -> AI 분석 생략")
+        return {"analysis_result": SAFE_RESULT}
+
+    cache_key = script_cache_key(script)
+    cached_result = _analysis_cache.get(cache_key)
+    if cached_result is not None:
+        print("분석 결과 캐시 사용")
+        return {"analysis_result": cached_result}
+
+    response = await _batcher.submit(script)
+    
+    print("전체 응답: ", response)
+    result = format_report(response)
+    _analysis_cache[cache_key] = result
+
+    print("result: ", result)
+    return {"analysis_result": result}
+
+
+def make_report_node(model_name: str, prompt_prefix: str, prompt_suffix: str):
+    """지정한 모델/프롬프트의 응답(마크다운 보고서)을 그대로 분석 결과로 쓰는 노드 (토큰 단위로 스트리밍됨)"""
+    async def report_analysis_node(state: AgentState):
+        if state.get("error"):
+            return {"analysis_result": f"분석 불가: {state['error']}"}
+
+        prompt_text = prompt_prefix + state['script_text'] + prompt_suffix
+        # 모델이나 프롬프트가 다르면 결과도 다르므로 둘 다 캐시 키에 포함
+        cache_key = script_cache_key(model_name + prompt_text)
+        cached_result = _analysis_cache.get(cache_key)
+        if cached_result is not None:
+            print("분석 결과 캐시 사용")
+            return {"analysis_result": cached_result}
+
+        print(f"🤖 AI 텍스트 포렌식 분석 중 ({model_name})...")
+        result = await invoke_text(model_name, prompt_text)
+        _analysis_cache[cache_key] = result
+        return {"analysis_result": result}
+
+    return report_analysis_node
+
+
+def build_graph(
+    model_name: str = MODEL_NAME,
+    prompt_prefix: str = PROMPT_PREFIX,
+    prompt_suffix: str = PROMPT_SUFFIX,
+    structured: bool = True,
+):
+    """
+    랭그래프 구축하기
+    structured=True (백엔드 기본값): 위험 키워드 사전 검사 후 요청을 묶어 구조화된 Report로 분석 ("[판정] 요약" 한 줄)
+    structured=False: 지정한 모델/프롬프트의 응답(마크다운 보고서)을 사전 검사 없이 그대로 결과로 사용
+    자막 추출, 스크립트/분석 결과 캐시, Gemini 클라이언트는 두 방식이 공유함
+    """
+    if structured:
+        # 요청 묶음 처리는 build_batch_prompt와 짝을 이루는 기본 모델/프롬프트로만 동작
+        if (model_name, prompt_prefix, prompt_suffix) != (MODEL_NAME, PROMPT_PREFIX, PROMPT_SUFFIX):
+            raise ValueError("구조화된 분석은 기본 모델/프롬프트만 지원합니다. structured=False로 지정하세요.")
+        analyst = text_analysis_node
+    else:
+        analyst = make_report_node(model_name, prompt_prefix, prompt_suffix)
+
+    workflow = StateGraph(AgentState)
+    workflow.add_node("loader", make_script_loader_node(model_name))
+    workflow.add_node("analyst", analyst)
+    workflow.set_entry_point("loader")
+    workflow.add_edge("loader", "analyst")
+    workflow.add_edge("analyst", END)
+
+    return workflow.compile()
+
+
+# 모듈 로드 시 한 번만 컴파일해 두고 모든 요청이 같은 그래프를 사용
+app = build_graph()
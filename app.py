@@ -1,16 +1,17 @@
 import streamlit as st
 import os
-import re
 from typing import TypedDict, Optional
 from dotenv import load_dotenv
 
 # 라이브러리 임포트
 from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-from youtube_transcript_api.formatters import TextFormatter
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_core.messages import HumanMessage
 from langgraph.graph import StateGraph, END
 
+# URL 파싱, 자막 이어 붙이기, 토큰 예산 자르기는 백엔드와 같은 agent 모듈의 헬퍼를 사용
+from agent import extract_video_id, join_snippets, trim_to_token_budget
+
 # --- 0. 기본 설정 및 환경변수 ---
 st.set_page_config(page_title="실버 가디언: 유튜브 AI 분석기", page_icon="🛡️")
 
@@ -26,17 +27,16 @@ class AgentState(TypedDict):
     error: Optional[str]
 
 # --- 2. 헬퍼 함수 ---
-def extract_video_id(url: str) -> Optional[str]:
-    """유튜브 URL에서 Video ID 추출"""
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-        r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})'
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
+# 자막 우선순위: 한국어(수동 -> 자동) -> 영어(수동 -> 자동) -> 번역 가능한 그 외 언어(수동 -> 자동)
+# (그 외 언어는 번역해서 써야 하므로 수동 자막이라도 번역할 수 없으면 번역 가능한 자동 자막보다 뒤로 보냄)
+def _transcript_priority(transcript) -> tuple:
+    language_code = transcript.language_code
+    return (
+        language_code == 'ko',
+        language_code == 'en',
+        language_code in ('ko', 'en') or transcript.is_translatable,
+        not transcript.is_generated,
+    )
 
 def get_video_script(video_id: str) -> str:
     """Video ID로 자막을 추출합니다."""
@@ -45,33 +45,63 @@ def get_video_script(video_id: str) -> str:
         
         transcript_list = ytt_api.list(video_id)
         
-        # 자막 우선순위: 한국어 수동 -> 영어 수동 -> 한국어 자동 -> 영어 자동
-        try:
-            transcript = transcript_list.find_transcript(['ko'])
-        except:
-            try:
-                transcript = transcript_list.find_transcript(['en'])
-            except:
-                try:
-                    transcript = transcript_list.find_generated_transcript(['ko'])
-                except:
-                    # 최후의 수단: 번역 가능한 자막을 한국어로 번역
-                    try:
-                        transcript = transcript_list.find_manually_created_transcript(['en'])
-                        transcript = transcript.translate('ko')
-                    except:
-                         # 자동 생성된 영어라도 가져와서 번역 시도
-                        transcript = transcript_list.find_generated_transcript(['en'])
-                        transcript = transcript.translate('ko')
-
-        formatter = TextFormatter()
-        script_text = formatter.format_transcript(transcript.fetch())
-        return script_text.replace("\n", " ")
+        # 자막 목록을 한 번만 훑어 우선순위가 가장 높은 자막 선택
+        transcript = max(transcript_list, key=_transcript_priority, default=None)
+        if transcript is None:
+            return "ERROR: 이 영상에는 자막이 없습니다."
+
+        # 최후의 수단: 한국어/영어 자막이 없으면 번역 가능한 자막을 한국어로 번역
+        if transcript.language_code not in ('ko', 'en'):
+            if not transcript.is_translatable:
+                return "ERROR: 이 영상에는 자막이 없습니다."
+            transcript = transcript.translate('ko')
+
+        return join_snippets(transcript.fetch())
         
     except (TranscriptsDisabled, NoTranscriptFound):
         return "ERROR: 이 영상에는 자막이 없습니다."
     except Exception as e:
-        return f"ERROR: 자막 추출 실패 ({str(e)})"
+        return f"ERROR: 자막 추출 실패 ({e.__class__.__name__}: {str(e)})"
+
+# 프롬프트에 넣을 스크립트의 최대 토큰 수 (백엔드보다 넉넉하게, 한국어 약 10000자)
+MAX_INPUT_TOKENS = 10000
+
+# 분석 프롬프트 (고정된 앞/뒤 부분은 한 번만 만들어 두고, 요청마다 스크립트만 이어 붙임)
+PROMPT_PREFIX = '''
+        당신은 노인 소비자 보호 및 금융 사기 예방 전문가입니다.
+        아래 텍스트(유튜브 스크립트 등)를 정밀 분석하여, 판단력이 흐려지기 쉬운 고령층을 타깃으로 한 '불법 투자 권유', '기만적 상품 판매', 또는 '스팸성 콘텐츠'인지 판별하세요.
+
+        [분석할 스크립트]
+        "'''
+
+PROMPT_SUFFIX = '''" ... (길이 제한으로 일부 생략)
+
+        [중점 분석 항목]
+        1. **심리적 조작 및 공포 마케팅**: 건강 공포심 유발, 거짓 긴급성 강조.
+        2. **비현실적 약속 및 과장 광고**: 원금 보장, 기적의 치료법 등.
+        3. **위험한 행동 유도**: 리딩방 유입, 특정 물품 구매 강요.
+
+        [최종 답변 형식]
+        ## 🚨 노인 대상 유해 콘텐츠 분석 결과
+
+        **1. 판정**: [고위험 스팸 및 사기 의심 / 주의 필요(과장 광고) / 안전한 콘텐츠]
+        **2. 위험도 점수**: [0~100점]
+        
+        **3. 주요 적발 소견**:
+           - **[자극적 키워드]**:
+           - **[심리 조작 기법]**:
+           - **[유도 방식]**:
+
+        **4. 소비자 행동 지침**:
+           - (구체적인 행동 가이드)
+        '''
+
+# 모델 초기화 (참고: gemini-2.5-flash는 예시 모델명이며, 실제 사용 가능한 모델명으로 변경 필요할 수 있음. 예: gemini-1.5-flash)
+# 사용자가 요청한 모델명 유지, 필요시 'gemini-1.5-flash'로 변경하세요.
+@st.cache_resource
+def get_llm(api_key: str) -> ChatGoogleGenerativeAI:
+    """API 키별로 Gemini 클라이언트를 한 번만 만들어 재실행/세션 간에 재사용"""
+    return ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=api_key)
 
 # --- 3. 노드 함수 정의 ---
 def script_loader_node(state: AgentState):
@@ -101,37 +131,10 @@ def text_analysis_node(state: AgentState):
     if not api_key:
         return {"error": "Google API Key가 설정되지 않았습니다."}
 
-    # 모델 초기화 (참고: gemini-2.5-flash는 예시 모델명이며, 실제 사용 가능한 모델명으로 변경 필요할 수 있음. 예: gemini-1.5-flash)
-    # 사용자가 요청한 모델명 유지, 필요시 'gemini-1.5-flash'로 변경하세요.
     try:
-        llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=api_key)
+        llm = get_llm(api_key)
         
-        prompt_text = f"""
-        당신은 노인 소비자 보호 및 금융 사기 예방 전문가입니다.
-        아래 텍스트(유튜브 스크립트 등)를 정밀 분석하여, 판단력이 흐려지기 쉬운 고령층을 타깃으로 한 '불법 투자 권유', '기만적 상품 판매', 또는 '스팸성 콘텐츠'인지 판별하세요.
-
-        [분석할 스크립트]
-        "{script[:10000]}" ... (길이 제한으로 일부 생략)
-
-        [중점 분석 항목]
-        1. **심리적 조작 및 공포 마케팅**: 건강 공포심 유발, 거짓 긴급성 강조.
-        2. **비현실적 약속 및 과장 광고**: 원금 보장, 기적의 치료법 등.
-        3. **위험한 행동 유도**: 리딩방 유입, 특정 물품 구매 강요.
-
-        [최종 답변 형식]
-        ## 🚨 노인 대상 유해 콘텐츠 분석 결과
-
-        **1. 판정**: [고위험 스팸 및 사기 의심 / 주의 필요(과장 광고) / 안전한 콘텐츠]
-        **2. 위험도 점수**: [0~100점]
-        
-        **3. 주요 적발 소견**:
-           - **[자극적 키워드]**:
-           - **[심리 조작 기법]**:
-           - **[유도 방식]**:
-
-        **4. 소비자 행동 지침**:
-           - (구체적인 행동 가이드)
-        """
+        prompt_text = PROMPT_PREFIX + trim_to_token_budget(script, MAX_INPUT_TOKENS) + PROMPT_SUFFIX
         
         response = llm.invoke([HumanMessage(content=prompt_text)])
         return {"analysis_result": response.content}
@@ -148,6 +151,16 @@ def create_graph():
     workflow.add_edge("analyst", END)
     return workflow.compile()
 
+def stream_analysis(app, inputs: dict, result: dict):
+    """그래프를 실행하면서 분석 노드의 Gemini 응답을 생성되는 대로 내보내고, 최종 상태는 result에 담음"""
+    for mode, payload in app.stream(inputs, stream_mode=["messages", "values"]):
+        if mode == "values":
+            result.update(payload)
+            continue
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") == "analyst" and chunk.content:
+            yield chunk.content
+
 # --- 5. Streamlit UI 구성 ---
 def main():
     # 사이드바 설정
@@ -179,32 +192,39 @@ def main():
         # 그래프 실행
         app = create_graph()
         
-        # 진행 상황 표시용 컨테이너
-        status_container = st.container()
+        # 결과 표시 영역 (분석 결과는 생성되는 대로 아래쪽 영역에 바로 표시)
+        header_container = st.container()
+        analysis_container = st.container()
         
         with st.spinner("영상을 분석하고 있습니다... (자막 추출 및 AI 분석)"):
             try:
                 inputs = {"youtube_url": url}
-                result = app.invoke(inputs)
+                result = {}
+                with analysis_container:
+                    streamed = st.write_stream(stream_analysis(app, inputs, result))
                 
                 # 에러 처리
                 if result.get("error"):
-                    st.error(f"오류 발생: {result['error']}")
+                    header_container.error(f"오류 발생: {result['error']}")
                 else:
                     # 결과 표시
-                    st.success("분석이 완료되었습니다!")
-                    
-                    # 1. 영상 썸네일 표시
-                    if result.get("video_id"):
-                        st.image(f"https://img.youtube.com/vi/{result['video_id']}/0.jpg", width=400)
-                    
-                    # 2. 분석 결과 (Markdown)
-                    st.markdown("---")
-                    st.markdown(result["analysis_result"])
+                    with header_container:
+                        st.success("분석이 완료되었습니다!")
+                        
+                        # 1. 영상 썸네일 표시
+                        if result.get("video_id"):
+                            st.image(f"https://img.youtube.com/vi/{result['video_id']}/0.jpg", width=400)
+                        
+                        # 2. 분석 결과 (Markdown, 위에서 스트리밍으로 표시됨)
+                        st.markdown("---")
                     
-                    # 3. 추출된 스크립트 (Expander로 숨김 처리)
-                    with st.expander("📝 추출된 자막 원본 보기"):
-                        st.text_area("자막 내용", result.get("script_text", ""), height=300)
+                    with analysis_container:
+                        if not streamed:
+                            st.markdown(result["analysis_result"])
+                        
+                        # 3. 추출된 스크립트 (Expander로 숨김 처리)
+                        with st.expander("📝 추출된 자막 원본 보기"):
+                            st.text_area("자막 내용", result.get("script_text", ""), height=300)
                         
             except Exception as e:
                 st.error(f"실행 중 예기치 못한 오류가 발생했습니다: {str(e)}")
@@ -1,29 +1,54 @@
 import os
+import json
+import asyncio
+from contextlib import asynccontextmanager
 
-from typing import Optional
+from typing import List, Optional
 from dotenv import load_dotenv
 
 # fastapi
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from pydantic import BaseModel, conlist
 
 # youtube 검색을 위한 라이브러리
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+import httpx
+
+# 분석 결과 캐시
+import redis.asyncio as redis
 
 # 사용자 정의 모듈
-from supervisor import build_graph
+from supervisor import PROMPT_VERSION, warm_up_llm
+from supervisor import app as graph_runner
 
 
 # 환경 변수 로드
 load_dotenv()
 
+# YouTube Data API 호출용 공유 HTTP 클라이언트 (모든 요청에서 연결 재사용)
+YOUTUBE_SEARCH_URL = "https://www.googleapis.com/youtube/v3/search"
+http_client = httpx.AsyncClient(timeout=10.0)
+
+# 분석 결과 캐시 (REDIS_URL이 설정된 경우에만 사용)
+ANALYSIS_CACHE_TTL_SEC = 7 * 24 * 60 * 60
+redis_client = redis.from_url(os.environ["REDIS_URL"], decode_responses=True) if os.getenv("REDIS_URL") else None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await http_client.aclose()
+    if redis_client is not None:
+        await redis_client.aclose()
+
 # FastAPI 설정
 app = FastAPI(
     title="YouTube Scam Detector API",
     description="유튜브 영상의 자막을 분석하여 노인 대상 사기/스팸 여부를 판별합니다.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # [TODO]: 네트워크 접근 수정
@@ -35,6 +60,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 분석 결과 등 1KB 이상의 응답은 gzip으로 압축
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# 동시에 검색 및 분석할 최대 영상 수 (Google API 분당 요청 한도 고려)
+MAX_CONCURRENCY = 8
+_search_semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+# /search_batch 한 번에 받을 수 있는 최대 영상 수 (넘으면 422)
+MAX_BATCH_REQUESTS = 20
+
 # 프론트엔드가 요청하는 내용
 class SearchRequest(BaseModel):
     title: str
@@ -54,21 +88,23 @@ class SearchResponse(BaseModel):
 
 
 # 제목, 채널 명으로 유튜브 링크 검색하기
-def search_video_on_youtube(query: str):
+async def search_video_on_youtube(query: str):
     api_key = os.getenv("YOUTUBE_API_KEY")
     if not api_key:
         return {"error": "서버 설정 오류: YOUTUBE_API_KEY가 없습니다."}
 
     try:
-        youtube = build("youtube", "v3", developerKey=api_key)
-        
-        # 검색 요청 (type='video', part='snippet', 결과 1개)
-        search_response = youtube.search().list(
-            q=query,
-            part="snippet",
-            type="video",
-            maxResults=1
-        ).execute()
+        # 검색 요청 (type='video', part='snippet', 결과 1개, 사용하는 필드만 요청)
+        # API 키는 URL에 남지 않도록 쿼리 대신 헤더로 전송
+        response = await http_client.get(YOUTUBE_SEARCH_URL, headers={"X-Goog-Api-Key": api_key}, params={
+            "q": query,
+            "part": "snippet",
+            "type": "video",
+            "maxResults": 1,
+            "fields": "items(id/videoId,snippet(title,channelTitle))",
+        })
+        response.raise_for_status()
+        search_response = response.json()
 
         items = search_response.get("items", [])
         if not items:
@@ -87,27 +123,51 @@ def search_video_on_youtube(query: str):
             "url": f"https://www.youtube.com/watch?v={video_id}"
         }
 
-    except HttpError as e:
-        return {"error": f"YouTube API 오류: {e}"}
+    except httpx.HTTPStatusError as e:
+        # 예외 메시지에는 요청 URL 전체가 들어가므로 클라이언트에는 상태 코드만 전달
+        print(f"YouTube API 오류: {e}")
+        return {"error": f"YouTube API 오류 (HTTP {e.response.status_code})"}
     except Exception as e:
         return {"error": f"검색 중 오류 발생: {e}"}
 
 
 
-# 프론트엔드가 호출하는 부분
-@app.post("/search", response_model=SearchResponse)
-def search_video_endpoint(request: SearchRequest):
-    """
-    제목과 채널명을 받아 유튜브 URL을 검색하고, 
-    해당 영상의 자막을 추출하여 즉시 사기 여부를 분석합니다.
-    """
+# 캐시 키에 프롬프트 버전을 넣어 프롬프트가 바뀌면 이전 결과를 쓰지 않도록 함
+def analysis_cache_key(video_id: str) -> str:
+    return f"analysis:{video_id}:{PROMPT_VERSION}"
+
+# 캐시 장애는 분석 자체를 막지 않도록 로그만 남김
+async def get_cached_analysis(video_id: str) -> Optional[str]:
+    if redis_client is None:
+        return None
+    try:
+        return await redis_client.get(analysis_cache_key(video_id))
+    except Exception as e:
+        print(f"분석 캐시 조회 실패: {e}")
+        return None
+
+async def set_cached_analysis(video_id: str, analysis_result: str):
+    if redis_client is None:
+        return
+    try:
+        await redis_client.setex(analysis_cache_key(video_id), ANALYSIS_CACHE_TTL_SEC, analysis_result)
+    except Exception as e:
+        print(f"분석 캐시 저장 실패: {e}")
+
+
+# 검색 단계 (검색 실패 시에는 그대로 돌려줄 SearchResponse를 반환)
+async def search_video(request: SearchRequest):
     # 백엔드: 영상 URL 수집 및 전송
     # 1. 검색어 조합
     query = f"{request.title} {request.channel}".strip()
     print(f"검색 요청: '{query}'")
     
     # 2. 실제 YouTube 검색 수행
-    search_result = search_video_on_youtube(query)
+    # 검색하는 동안 Gemini 클라이언트를 미리 준비해 둠
+    search_result, _ = await asyncio.gather(
+        search_video_on_youtube(query),
+        asyncio.to_thread(warm_up_llm),
+    )
     # print('로그 : 유튜브 api 실행 완료')
     
     # 2-1. 검색 에러 처리
@@ -122,10 +182,35 @@ def search_video_endpoint(request: SearchRequest):
     # 2-2. 검색 결과 없음 처리
     if not search_result:
         return SearchResponse(found=False, message="영상을 찾을 수 없습니다.")
-    
+
+    return search_result
+
+
+# 검색된 영상 정보를 담은 응답 만들기
+def found_response(search_result: dict, message: str, analysis_result: Optional[str] = None, error: Optional[str] = None) -> SearchResponse:
+    return SearchResponse(
+        video_id=search_result['video_id'],
+        youtube_url=search_result['url'],
+        title=search_result['title'],
+        channel_title=search_result['channel_title'],
+        found=True,
+        message=message,
+        analysis_result=analysis_result,
+        error=error
+    )
+
+
+# 분석 단계 (검색된 영상의 자막 추출 및 사기 여부 분석)
+async def analyze_video(search_result: dict) -> SearchResponse:
     # 3. 검색된 URL로 분석(AgentGraph) 실행
     print(f"검색 성공: {search_result['title']} ({search_result['url']}) -> 분석 시작")
 
+    # 3-1. 같은 영상을 이미 분석했다면 캐시된 결과를 바로 반환
+    cached_result = await get_cached_analysis(search_result['video_id'])
+    if cached_result is not None:
+        print("분석 결과 캐시 사용: ", search_result['video_id'])
+        return found_response(search_result, "검색 및 분석 완료", analysis_result=cached_result)
+
     # [TODO]:  DB에 기존 데이터가 있는가?
     IS_IN_DB = False
     if IS_IN_DB:
@@ -136,8 +221,8 @@ def search_video_endpoint(request: SearchRequest):
         # [TODO]: 백엔드: 데이터 검증(FE 데이터 vs BE 데이터)
         try:
             # 슈퍼바이저: 데이터 전송 및 리포트 생성
-            initial_state = {"youtube_url": search_result['url']}
-            analysis_output = graph_runner.invoke(initial_state)
+            initial_state = {"video_id": search_result['video_id'], "youtube_url": search_result['url']}
+            analysis_output = await graph_runner.ainvoke(initial_state)
             #analysis_output = {"analysis_result": "테스트데이터입니다"}
             print("분석 결과: ", analysis_output.get("analysis_result"))
 
@@ -147,38 +232,93 @@ def search_video_endpoint(request: SearchRequest):
             
             # 결과 통합 반환
             if analysis_output.get("error"):
-                return SearchResponse(
-                video_id=search_result['video_id'],
-                youtube_url=search_result['url'],
-                title=search_result['title'],
-                channel_title=search_result['channel_title'],
-                found=True,
-                message="검색 성공 및 분석 실패",
-                error=analysis_output.get("error")
-            )
-
-            return SearchResponse(
-                video_id=search_result['video_id'],
-                youtube_url=search_result['url'],
-                title=search_result['title'],
-                channel_title=search_result['channel_title'],
-                found=True,
-                message="검색 및 분석 완료",
-                analysis_result=analysis_output.get("analysis_result"),
-                error=None
-            )
+                return found_response(search_result, "검색 성공 및 분석 실패", error=analysis_output.get("error"))
+
+            await set_cached_analysis(search_result['video_id'], analysis_output.get("analysis_result"))
+
+            return found_response(search_result, "검색 및 분석 완료", analysis_result=analysis_output.get("analysis_result"))
 
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
 
+# 분석 중 예외(500)를 영상 정보가 담긴 "분석 실패" 응답으로 변환 (/search/stream, /search_batch)
+async def analyze_video_or_error(search_result: dict) -> SearchResponse:
+    try:
+        return await analyze_video(search_result)
+    except HTTPException as e:
+        return found_response(search_result, "검색 성공 및 분석 실패", error=e.detail)
+
+
+# 검색 + 분석 처리 (/search, 분석 실패 시 500)
+async def search_and_analyze(request: SearchRequest) -> SearchResponse:
+    """
+    제목과 채널명을 받아 유튜브 URL을 검색하고, 
+    해당 영상의 자막을 추출하여 즉시 사기 여부를 분석합니다.
+    """
+    search_result = await search_video(request)
+    if isinstance(search_result, SearchResponse):
+        return search_result
+    return await analyze_video(search_result)
+
+
+# Server-Sent Events 형식의 이벤트 한 개
+def sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# 프론트엔드가 호출하는 부분
+@app.post("/search", response_model=SearchResponse)
+async def search_video_endpoint(request: SearchRequest):
+    """
+    제목과 채널명을 받아 유튜브 URL을 검색하고, 
+    해당 영상의 자막을 추출하여 즉시 사기 여부를 분석합니다.
+    """
+    return await search_and_analyze(request)
+
+
+@app.post("/search/stream")
+async def search_stream_endpoint(request: SearchRequest):
+    """
+    /search와 같은 처리를 하되 결과를 Server-Sent Events로 단계별로 보냅니다.
+    검색이 끝나는 즉시 영상 정보("search" 이벤트)를 먼저 보내 화면을 채울 수 있게 하고,
+    분석이 끝나면 /search와 같은 형식의 최종 결과("result" 이벤트)를 보냅니다.
+    """
+    async def events():
+        search_result = await search_video(request)
+        if isinstance(search_result, SearchResponse):
+            yield sse_event("result", search_result.model_dump())
+            return
+
+        yield sse_event("search", search_result)
+        response = await analyze_video_or_error(search_result)
+        yield sse_event("result", response.model_dump())
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
+@app.post("/search_batch", response_model=List[SearchResponse])
+async def search_batch_endpoint(requests: conlist(SearchRequest, max_length=MAX_BATCH_REQUESTS)):
+    """
+    여러 영상을 동시에 검색 및 분석합니다. (요청당 최대 MAX_BATCH_REQUESTS개, 최대 MAX_CONCURRENCY개씩)
+    결과는 요청 순서대로 반환하며, 한 영상의 실패가 다른 영상의 결과에 영향을 주지 않습니다.
+    """
+    async def run(request: SearchRequest) -> SearchResponse:
+        async with _search_semaphore:
+            search_result = await search_video(request)
+            if isinstance(search_result, SearchResponse):
+                return search_result
+            return await analyze_video_or_error(search_result)
+
+    return await asyncio.gather(*(run(request) for request in requests))
+
+
 @app.get("/")
 def health_check():
     print("/ get test")
     return {"status": "ok", "message": "Server is running"}
 
 
-graph_runner = build_graph()
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,119 +1,21 @@
-import os
-import re
-from typing import TypedDict, Optional
-from dotenv import load_dotenv
-
-from youtube_transcript_api import YouTubeTranscriptApi
-
-
-# 자막 추출 라이브러리
-from youtube_transcript_api import YouTubeTranscriptApi
-from youtube_transcript_api.formatters import TextFormatter
-
-# LangChain & LangGraph imports
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage
-from langgraph.graph import StateGraph, END
-
-# 환경 변수 로드 (GOOGLE_API_KEY 필수)
-load_dotenv()
-
-# --- 1. State 정의 ---
-class AgentState(TypedDict):
-    youtube_url: str
-    video_id: Optional[str]
-    script_text: Optional[str]    # 추출된 스크립트
-    analysis_result: Optional[str]
-    error: Optional[str]
-
-# --- 2. 헬퍼 함수 (자막 추출) ---
-
-def extract_video_id(url: str) -> Optional[str]:
-    """유튜브 URL에서 Video ID 추출"""
-    patterns = [
-        r'(?:v=|\/)([0-9A-Za-z_-]{11}).*',
-        r'(?:youtu\.be\/)([0-9A-Za-z_-]{11})'
-    ]
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
-
-# 상단 imports 부분은 그대로 두되, 함수 내 import는 제거
-from youtube_transcript_api import YouTubeTranscriptApi, TranscriptsDisabled, NoTranscriptFound
-
-def get_video_script(video_id: str) -> str:
-    """
-    Video ID로 자막을 추출합니다. (한국어 -> 영어 -> 자동생성 순)
-    """
-    try:
-        # 1. 자막 리스트 가져오기
-        ytt_api = YouTubeTranscriptApi()
-        transcript_list = ytt_api.list(video_id)
-        #transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
-        
-        # 2. 자막 찾기 (filter를 사용하면 try-except 중첩을 줄일 수 있습니다)
-        # 'ko' 수동 -> 'en' 수동 -> 'ko' 자동 -> 'en' 자동 순서로 찾습니다.
-        try:
-            transcript = transcript_list.find_transcript(['ko', 'en'])
-        except:
-            # 수동 자막이 없으면 자동 생성 자막 탐색
-            try:
-                transcript = transcript_list.find_generated_transcript(['ko', 'en'])
-            except:
-                 # 그래도 없으면 번역 가능한 아무 언어나 가져와서 한국어로 번역 시도
-                transcript = transcript_list.find_manually_created_transcript(['en'])
-                transcript = transcript.translate('ko')
-
-        # 3. 텍스트로 변환
-        formatter = TextFormatter()
-        script_text = formatter.format_transcript(transcript.fetch())
-        
-        return script_text.replace("\n", " ")
-        
-    except (TranscriptsDisabled, NoTranscriptFound):
-        return "ERROR: 이 영상에는 자막이 없습니다."
-    except Exception as e:
-        return f"ERROR: 자막 추출 실패 ({str(e)})"
-
-# --- 3. 노드 함수 정의 ---
-
-def script_loader_node(state: AgentState):
-    """URL에서 스크립트만 빠르게 추출하는 노드"""
-    url = state['youtube_url']
-    print(f"📥 스크립트 추출 시도 중... ({url})")
-    
-    video_id = extract_video_id(url)
-    if not video_id:
-        return {"error": "유효하지 않은 유튜브 URL입니다."}
-
-    script = get_video_script(video_id)
-    
-    if script.startswith("ERROR"):
-        return {"error": script, "script_text": None}
-    
-    print(f"✅ 스크립트 추출 완료 (길이: {len(script)}자)")
-    return {"video_id": video_id, "script_text": script}
-
-def text_analysis_node(state: AgentState):
-    """Gemini를 사용하여 텍스트 패턴을 분석하는 노드"""
-    if state.get("error"):
-        return {"analysis_result": f"분석 불가: {state['error']}"}
-        
-    script = state['script_text']
-    print("🤖 AI 텍스트 포렌식 분석 중 (Gemini 2.0 Flash)...")
-
-    # 모델 초기화
-    llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash")
-    
-    # 프롬프트: 텍스트 기반 AI 판별에 집중
-    prompt_text = f"""
+import asyncio
+from typing import List, Union
+
+# 자막 추출, 캐시, Gemini 클라이언트 등은 백엔드와 같은 agent 모듈을 사용
+from agent import build_graph
+
+# CLI는 고령층 대상 상세 보고서(마크다운)를 생성하고 토큰 단위로 출력
+MODEL_NAME = "gemini-2.5-flash"
+
+# 분석 프롬프트 (고정된 앞/뒤 부분은 한 번만 만들어 두고, 요청마다 스크립트만 이어 붙임)
+PROMPT_PREFIX = '''
     당신은 노인 소비자 보호 및 금융 사기 예방 전문가입니다.
 아래 텍스트(유튜브 스크립트 등)를 정밀 분석하여, 판단력이 흐려지기 쉬운 고령층을 타깃으로 한 '불법 투자 권유', '기만적 상품 판매', 또는 '스팸성 콘텐츠'인지 판별하세요.
 
 [분석할 스크립트]
-"{script[:5000]}" ... (이하 생략)
+"'''
+
+PROMPT_SUFFIX = '''" ... (이하 생략)
 
 [중점 분석 항목]
 1. **심리적 조작 및 공포 마케팅 (Fear & Greed)**:
@@ -143,33 +45,54 @@ def text_analysis_node(state: AgentState):
 
 **4. 소비자 행동 지침**:
    - (이 콘텐츠를 접한 노인 사용자가 취해야 할 구체적인 행동 가이드. 예: "절대 링크를 누르지 마세요", "자녀와 상의하세요")
-    """
-
-    response = llm.invoke([HumanMessage(content=prompt_text)])
-    return {"analysis_result": response.content}
-
-# --- 4. 그래프 구축 ---
-
-workflow = StateGraph(AgentState)
-
-# 노드 추가
-workflow.add_node("loader", script_loader_node)
-workflow.add_node("analyst", text_analysis_node)
-
-# 엣지 연결
-workflow.set_entry_point("loader")
-workflow.add_edge("loader", "analyst")
-workflow.add_edge("analyst", END)
+    '''
+
+app = build_graph(MODEL_NAME, PROMPT_PREFIX, PROMPT_SUFFIX, structured=False)
+
+
+# --- 실행부 ---
+async def stream_analysis(inputs: dict) -> dict:
+    """그래프를 실행하면서 Gemini 분석 결과를 생성되는 대로 출력하고, 최종 상태를 반환"""
+    result = {}
+    streamed = False
+    async for mode, payload in app.astream(inputs, stream_mode=["messages", "values"]):
+        if mode == "values":
+            result = payload
+            continue
+        chunk, metadata = payload
+        if metadata.get("langgraph_node") == "analyst" and chunk.content:
+            if not streamed:
+                print("\n" + "="*40)
+                streamed = True
+            print(chunk.content, end="", flush=True)
+
+    # 캐시 사용, 자막 오류 등으로 스트리밍된 내용이 없으면 최종 결과를 한 번에 출력
+    if not streamed:
+        print("\n" + "="*40)
+        print(result["analysis_result"], end="")
+    print("\n" + "="*40)
+    return result
 
-app = workflow.compile()
+async def analyze_many(urls: List[str]) -> List[Union[dict, Exception]]:
+    """
+    여러 영상을 동시에 분석 (자막 추출과 Gemini 호출이 영상 간에 겹쳐 진행됨)
+    한 영상이 실패해도 나머지 결과는 유지되도록 실패한 영상은 결과 대신 예외를 담아 반환
+    """
+    return await asyncio.gather(*(app.ainvoke({"youtube_url": url}) for url in urls), return_exceptions=True)
 
-# --- 5. 실행부 ---
 if __name__ == "__main__":
-    test_url = input("분석할 유튜브 링크 입력: ")
-    
-    inputs = {"youtube_url": test_url}
-    result = app.invoke(inputs)
-    
-    print("\n" + "="*40)
-    print(result["analysis_result"])
-    print("="*40)
\ No newline at end of file
+    test_urls = input("분석할 유튜브 링크 입력 (여러 개는 공백으로 구분): ").split()
+
+    if len(test_urls) == 1:
+        inputs = {"youtube_url": test_urls[0]}
+        asyncio.run(stream_analysis(inputs))
+    else:
+        results = asyncio.run(analyze_many(test_urls))
+        for url, result in zip(test_urls, results):
+            print("\n" + "="*40)
+            print(url)
+            if isinstance(result, Exception):
+                print(f"분석 실패: {result.__class__.__name__}: {result}")
+            else:
+                print(result.get("analysis_result", "분석 실패: 결과가 없습니다."))
+            print("="*40)
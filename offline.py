@@ -0,0 +1,151 @@
+import os
+import json
+import time
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from dotenv import load_dotenv
+
+# Gemini Batch API (비대화형 대량 분석용)
+from google import genai
+from google.genai import types
+
+# 사용자 정의 모듈
+from supervisor import MODEL_NAME, Report, build_prompt, extract_video_id, format_report, get_video_script, trim_to_token_budget
+
+
+# 환경 변수 로드 (GOOGLE_API_KEY 필수)
+load_dotenv()
+
+# 배치 작업 상태 확인 주기 (배치 작업은 수 분 ~ 수 시간 단위로 끝남)
+POLL_INTERVAL_SEC = 30
+# 자막을 동시에 가져올 최대 스레드 수
+MAX_SCRIPT_WORKERS = 8
+
+_DONE_STATES = {"JOB_STATE_SUCCEEDED", "JOB_STATE_FAILED", "JOB_STATE_CANCELLED", "JOB_STATE_EXPIRED"}
+
+# Report 모델과 같은 형태의 JSON으로 답하도록 지정
+_REPORT_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        name: {"type": "STRING", "description": field.description}
+        for name, field in Report.model_fields.items()
+    },
+    "required": list(Report.model_fields),
+}
+
+
+def _load_scripts(urls: List[str]) -> Dict[str, str]:
+    """URL 목록에서 {video_id: 스크립트}를 만든다. 자막이 없는 영상은 건너뜀"""
+    video_ids = []
+    for url in urls:
+        video_id = extract_video_id(url)
+        if not video_id:
+            print(f"⚠️ 유효하지 않은 유튜브 URL입니다: {url}")
+            continue
+        video_ids.append(video_id)
+    video_ids = list(dict.fromkeys(video_ids))
+
+    with ThreadPoolExecutor(max_workers=MAX_SCRIPT_WORKERS) as executor:
+        scripts = executor.map(get_video_script, video_ids)
+
+    loaded = {}
+    for video_id, script in zip(video_ids, scripts):
+        if script.startswith("ERROR"):
+            print(f"⚠️ {video_id}: {script}")
+            continue
+        loaded[video_id] = trim_to_token_budget(script)
+    return loaded
+
+
+def _write_requests(scripts: Dict[str, str]) -> str:
+    """배치 요청 JSONL 파일을 만들고 경로를 반환"""
+    with tempfile.NamedTemporaryFile("w", suffix=".jsonl", delete=False, encoding="utf-8") as f:
+        for video_id, script in scripts.items():
+            request = {
+                "key": video_id,
+                "request": {
+                    "contents": [{"role": "user", "parts": [{"text": build_prompt(script)}]}],
+                    "generationConfig": {
+                        "responseMimeType": "application/json",
+                        "responseSchema": _REPORT_SCHEMA,
+                    },
+                },
+            }
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+        return f.name
+
+
+def _parse_results(content: bytes) -> Dict[str, str]:
+    results = {}
+    for line in content.decode("utf-8").splitlines():
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        video_id = item.get("key")
+        if "error" in item:
+            print(f"⚠️ {video_id}: 분석 실패 ({item['error']})")
+            continue
+        try:
+            text = item["response"]["candidates"][0]["content"]["parts"][0]["text"]
+            results[video_id] = format_report(Report.model_validate_json(text))
+        except Exception as e:
+            print(f"⚠️ {video_id}: 응답 파싱 실패 ({e})")
+    return results
+
+
+def analyze_offline(urls: List[str]) -> Dict[str, str]:
+    """
+    Gemini Batch API로 여러 영상을 한 번에 분석합니다. (실시간 호출 대비 약 50% 비용)
+    결과가 나오기까지 수 분 이상 걸릴 수 있으므로 DB 백필 등 비대화형 작업에만 사용하고,
+    /search 같은 대화형 요청은 기존 LangGraph 경로를 사용합니다.
+    반환값: {video_id: 분석 결과}
+    """
+    scripts = _load_scripts(urls)
+    if not scripts:
+        return {}
+
+    client = genai.Client(api_key=os.getenv("GOOGLE_API_KEY"))
+
+    # 1. 요청 파일 업로드
+    request_path = _write_requests(scripts)
+    try:
+        uploaded = client.files.upload(
+            file=request_path,
+            config=types.UploadFileConfig(display_name="scam-analysis-requests", mime_type="jsonl"),
+        )
+    finally:
+        os.remove(request_path)
+
+    # 2. 배치 작업 생성
+    job = client.batches.create(
+        model=MODEL_NAME,
+        src=uploaded.name,
+        config={"display_name": f"scam-analysis-{len(scripts)}"},
+    )
+    print(f"📦 배치 작업 생성: {job.name} ({len(scripts)}건)")
+
+    # 3. 완료될 때까지 대기
+    while job.state.name not in _DONE_STATES:
+        time.sleep(POLL_INTERVAL_SEC)
+        job = client.batches.get(name=job.name)
+        print(f"⏳ 배치 작업 상태: {job.state.name}")
+
+    if job.state.name != "JOB_STATE_SUCCEEDED":
+        print(f"⚠️ 배치 작업 실패: {job.state.name} ({job.error})")
+        return {}
+
+    # 4. 결과 파싱
+    results = _parse_results(client.files.download(file=job.dest.file_name))
+
+    # [TODO]: 백엔드: DB에 리포트 내용 일괄 업데이트 저장
+
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    for video_id, result in analyze_offline(sys.argv[1:]).items():
+        print(f"{video_id}: {result}")